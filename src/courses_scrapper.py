@@ -1,49 +1,101 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from bs4 import BeautifulSoup, SoupStrainer
+from lxml import etree
+from lxml import html as lxml_html
 import re
 import json
-import time
 import os
 import logging
 import traceback
 from urllib.parse import urljoin, parse_qs
 from utils.logger_config import setup_logger
+from utils.fetcher import URLFetcher
+from utils.jsonl import write_ordered_jsonl, jsonl_to_json
+
 # Get logger from configuration
 logger = setup_logger("CamosunCourseScraper")
 
+# Only the course anchors of a listing page are built into the parse tree
+_COURSE_LINK_STRAINER = SoupStrainer('a', href=lambda href: href and 'preview_course' in href, onclick=True)
+
+# Compiled XPath expressions for course pages, evaluated directly on the lxml tree
+_XP_TITLE = etree.XPath('string((//*[@id="course_preview_title"])[1])')
+_XP_CONTENT = etree.XPath('(//td[contains(concat(" ", normalize-space(@class), " "), " block_content ")])[1]')
+_XP_FIRST_P = etree.XPath('(.//p)[1]')
+_XP_LI = etree.XPath('.//li')
+_XP_STRONG = etree.XPath('.//strong')
+
+# Paragraph strings that introduce the requisites list; the description comes before them
+_SECTION_MARKERS = frozenset(('Equivalencies', 'Pre or Co-requisites', 'Prerequisites'))
+
+# Progress is logged once per this many courses written, not once per course
+PROGRESS_LOG_EVERY = 50
+
+def _text_from_first_p(content):
+    """
+    Get the strings of the course content cell from its first <p> onwards
+
+    The course body is a single <p> holding the description, the credits and
+    the requisites. html.parser keeps it whole, but libxml2 closes a <p> at the
+    next <hr>, <ul> or <div>, which leaves it empty. Reading on to the end of
+    the cell keeps the same strings in the same order.
+
+    Args:
+        content (lxml.html.HtmlElement): The td.block_content cell
+
+    Returns:
+        list: Text and tail strings in document order, comments excluded
+    """
+    first_p = _XP_FIRST_P(content)
+    first_p = first_p[0] if first_p else None
+    started = first_p is None
+    text_list = []
+    for event, elem in etree.iterwalk(content, events=('start', 'end')):
+        if event == 'start':
+            if elem is first_p:
+                started = True
+            if started and elem.text and isinstance(elem.tag, str):
+                text_list.append(elem.text)
+        elif started and elem.tail and elem is not content:
+            text_list.append(elem.tail)
+    return text_list
+
 class CamosunCourseScraper:
     """
     Scraper for Camosun College course information from the academic calendar.
     """
     def __init__(self, base_url="https://calendar.camosun.ca", 
-                 courses_url="/content.php?catoid=25&navoid=2223"):
+                 courses_url="/content.php?catoid=25&navoid=2223",
+                 max_concurrency=8, requests_per_second=5, cache_file=None, parse_workers=None):
         self.base_url = base_url
         self.courses_url = urljoin(base_url, courses_url)
-        self.session = requests.Session()
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        self.courses_data = []
-        
-    def get_page(self, url):
-        """Get page content from URL"""
-        try:
-            response = self.session.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching page {url}: {str(e)}")
-            return None
+        # Number of course pages fetched at the same time, and the overall request
+        # rate, which slows down further whenever the server asks us to back off
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        # Optional on-disk cache used to revalidate pages with conditional requests
+        self.cache_file = cache_file
+        # Course pages are parsed in a process pool so parsing runs on every core
+        # while the event loop keeps fetching (None means os.cpu_count())
+        self.parse_workers = parse_workers
+        self.jsonl_file = None
+
+    def create_fetcher(self):
+        """Create the URLFetcher used for a scraping run"""
+        return URLFetcher(headers=self.headers, max_concurrency=self.max_concurrency,
+                          requests_per_second=self.requests_per_second, cache_file=self.cache_file)
 
     def extract_course_links(self, html_content):
         """Extract all course links from the course listing page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        soup = BeautifulSoup(html_content, 'lxml', parse_only=_COURSE_LINK_STRAINER)
         course_links = []
         
-        # Look for course links in the table
-        course_rows = soup.select('td.width a[href*="preview_course"]')
-        
-        for link in course_rows:
+        # The strainer already kept only course links, so no further selection is needed
+        for link in soup.find_all('a'):
             if link.has_attr('href'):
                 # extract coid from the onclick string
                 course_coid = link['onclick'].split(',')[1].strip().replace("'", "")
@@ -58,9 +110,10 @@ class CamosunCourseScraper:
         return course_links
     
 
-    def extract_course_details(self, html_content, course_url):
+    @staticmethod
+    def extract_course_details(html_content, course_url):
         """Extract detailed information from a course page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        tree = lxml_html.fromstring(html_content)
         
         course_data = {
             "url": course_url,
@@ -75,73 +128,68 @@ class CamosunCourseScraper:
         }
 
         # Extract course title and code
-        title_elem = soup.select_one('#course_preview_title')
-        if title_elem:
-            title_parts = title_elem.text.split('-')
-            if len(title_parts) == 2:
-                course_data["code"] = title_parts[0].strip()
-                course_data["title"] = title_parts[1].strip()
+        title_parts = _XP_TITLE(tree).split('-')
+        if len(title_parts) == 2:
+            course_data["code"] = title_parts[0].strip()
+            course_data["title"] = title_parts[1].strip()
         
         # Extract course details from the content
-        content = soup.select_one('td.block_content')
+        content = _XP_CONTENT(tree)
         if content:
-            # Extract course description
-            text_list = content.find('p').find_all(string=True)
-            course_description = max(text_list, key=len)
-            course_data["description"] = course_description
+            content = content[0]
+            # Strings of the course body, the list items and the <strong>
+            # label/value pairs (the value being the text right after the tag)
+            text_list = _text_from_first_p(content)
+            li_list = [li.text_content().strip().replace('\xa0', ' ') for li in _XP_LI(content)]
+            strong_values = [
+                (strong.text_content().strip().lower(), strong.tail.strip())
+                for strong in _XP_STRONG(content) if strong.tail
+            ]
+
+            # Find where each section marker first appears, in one scan
+            markers = {}
+            for i, text in enumerate(text_list):
+                if text in _SECTION_MARKERS:
+                    markers.setdefault(text, i)
+
+            # Extract course description, the longest string before the first marker
+            description_end = min(markers.values(), default=len(text_list))
+            description_candidates = text_list[:description_end] or text_list
+            if description_candidates:
+                course_data["description"] = max(description_candidates, key=len)
+
             # Extract course prerequisites list if exists
-            li_list = content.select('li')
             if li_list:
-                prereq_list = []
-                for li_elem in li_list:
-                    prereq_list.append(li_elem.text.strip().replace('\xa0', ' '))
-
-                if 'Equivalencies' in text_list:
-                    course_data['Equivalencies'] = prereq_list
+                if 'Equivalencies' in markers:
+                    course_data['Equivalencies'] = li_list
                     
-                elif 'Pre or Co-requisites' in text_list:
+                elif 'Pre or Co-requisites' in markers:
                     prereq_dict = {}
-                    list_key = text_list[text_list.index('Pre or Co-requisites') + 1].strip().replace(':', '')
-                    prereq_dict[list_key] = prereq_list
+                    list_key = text_list[markers['Pre or Co-requisites'] + 1].strip().replace(':', '')
+                    prereq_dict[list_key] = li_list
                     course_data['Pre or Co-requisites'] = prereq_dict
-                elif 'Prerequisites' in text_list:
+                elif 'Prerequisites' in markers:
                     prereq_dict = {}
-                    list_key = text_list[text_list.index('Prerequisites') + 1].strip().replace(':', '')
-                    prereq_dict[list_key] = prereq_list
+                    list_key = text_list[markers['Prerequisites'] + 1].strip().replace(':', '')
+                    prereq_dict[list_key] = li_list
                     course_data['Prerequisites'] = prereq_dict
 
             # Extract credits and hours
-            for strong_tag in content.find_all('strong'):
-                label = strong_tag.text.strip().lower()
-                value = strong_tag.next_sibling
-                if value:
-                    value = value.strip()
-                    
-                    if "credit" in label:
-                        course_data["credits"] = value
-                    elif "hour" in label:
-                        course_data["hours"] = value
-        
-        return course_data
-
-    def scrape_course(self, course_link):
-        """Scrape detailed info for a single course"""
-        logger.info(f"Scraping course: {course_link['code']}")
+            for label, value in strong_values:
+                if "credit" in label:
+                    course_data["credits"] = value
+                elif "hour" in label:
+                    course_data["hours"] = value
         
-        html_content = self.get_page(course_link['url'])
-        if not html_content:
-            return None
-        
-        course_data = self.extract_course_details(html_content, course_link)
         return course_data
 
-    def scrape_all_courses(self):
-        """Scrape all courses from all paginated course listing pages"""
+    async def get_all_course_links(self, fetcher):
+        """Get all course links from all paginated course listing pages"""
         all_course_links = []
 
         # First page (special URL)
         logger.info("Scraping first course page...")
-        first_page_content = self.get_page(self.courses_url)
+        first_page_content = await fetcher.get(self.courses_url)
         if first_page_content:
             all_course_links.extend(self.extract_course_links(first_page_content))
         else:
@@ -149,54 +197,199 @@ class CamosunCourseScraper:
 
         # Check how many pagination pages exist
         # Use one of the paginated URLs to find the total number of pages
-        paginated_base_url = (
-            "https://calendar.camosun.ca/content.php?"
+        paginated_base_url = urljoin(self.base_url, (
+            "/content.php?"
             "catoid=25&catoid=25&navoid=2223&filter%5Bitem_type%5D=3&"
             "filter%5Bonly_active%5D=1&filter%5B3%5D=1&filter%5Bcpage%5D={page}#acalog_template_course_filter"
-        )
+        ))
 
-        # Start from page 2 — first was already done
-        for page in range(2, 14):  # Use a high number and break when no content
-            page_url = paginated_base_url.format(page=page)
-            logger.info(f"Scraping page {page}: {page_url}")
-            page_content = self.get_page(page_url)
+        # Pages 2 to 13 are known up front and independent, so fetch them all at
+        # once (the fetcher still applies its concurrency and rate limits)
+        pages = range(2, 14)  # Use a high number and break when no content
+        page_urls = [paginated_base_url.format(page=page) for page in pages]
+        logger.info("Scraping pages %d-%d", pages[0], pages[-1])
+        page_contents = await asyncio.gather(*[fetcher.get(page_url) for page_url in page_urls])
 
+        for page, page_content in zip(pages, page_contents):
             if not page_content:
-                logger.info(f"No content found on page {page}. Assuming last page reached.")
+                logger.info("No content found on page %d. Assuming last page reached.", page)
                 break
 
             links = self.extract_course_links(page_content)
             if not links:
-                logger.info(f"No courses found on page {page}. Ending pagination.")
+                logger.info("No courses found on page %d. Ending pagination.", page)
                 break
 
             all_course_links.extend(links)
-            time.sleep(1)  # Be polite
 
-        logger.info(f"Total courses found: {len(all_course_links)}")
+        logger.info("Total courses found: %d", len(all_course_links))
+        return all_course_links
+
+    async def scrape_course(self, fetcher, course_link, parse_pool=None):
+        """Scrape detailed info for a single course, parsing it in parse_pool if given"""
+        logger.debug("Scraping course: %s", course_link['code'])
+
+        html_content = await fetcher.get(course_link['url'])
+        if not html_content:
+            return None
+        
+        if parse_pool is None:
+            return self.extract_course_details(html_content, course_link)
+
+        loop = asyncio.get_running_loop()
+        course_data = await loop.run_in_executor(
+            parse_pool, extract_course_details_worker, html_content, course_link)
+        return course_data
+
+    async def course_worker(self, fetcher, link_queue, results_queue, parse_pool=None, unchanged=None):
+        """
+        Scrape courses from the link queue until it is empty, queueing the results
+
+        Courses whose URL is in `unchanged` reuse that previously scraped record
+        instead of being fetched and parsed again.
+        """
+        unchanged = unchanged or {}
+        while True:
+            try:
+                index, course_link = link_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            course_data = unchanged.get(course_link['url'])
+            if course_data is not None:
+                await results_queue.put((index, course_data))
+                continue
 
-        # Now scrape each course
-        for i, course_link in enumerate(all_course_links):
             try:
-                logger.info(f"Processing course {i + 1}/{len(all_course_links)}: {course_link['code']}")
-                course_data = self.scrape_course(course_link)
-                if course_data:
-                    self.courses_data.append(course_data)
-                time.sleep(2)  # Be nice to the server
+                course_data = await self.scrape_course(fetcher, course_link, parse_pool)
             except Exception as e:
-                logger.error(f"Error processing course {course_link['code']}: {str(e)}")
-                logger.error("Full traceback:\n" + traceback.format_exc())
+                logger.error("Error processing course %s: %s", course_link['code'], e)
+                logger.error("Full traceback:\n%s", traceback.format_exc())
+            await results_queue.put((index, course_data))
 
-        return self.courses_data
-    
-    def save_to_json(self, filename="camosun_courses.json"):
-        """Save scraped data to a JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.courses_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Data saved to {filename}")
+    def load_previous_courses(self, jsonl_file):
+        """
+        Load the records of a previous run's JSONL file, keyed by course page URL
+
+        Returns:
+            dict: Course records by URL, empty if there is no previous file
+        """
+        if not os.path.exists(jsonl_file):
+            return {}
+
+        previous_courses = {}
+        with open(jsonl_file, encoding='utf-8') as fh:
+            for line_number, line in enumerate(fh, 1):
+                try:
+                    course_data = json.loads(line)
+                except json.JSONDecodeError:
+                    # e.g. the last line of a file cut short by a crash
+                    logger.warning("Skipping unreadable line %d of %s", line_number, jsonl_file)
+                    continue
+                # "url" holds the course link the record was scraped from
+                course_url = course_data["url"]
+                if isinstance(course_url, dict):
+                    course_url = course_url["url"]
+                previous_courses[course_url] = course_data
+        return previous_courses
+
+    async def validate_cache(self, fetcher, urls, previous_courses):
+        """
+        Revalidate cached course pages with concurrent conditional GETs
+
+        Only pages that are both in the HTTP cache and in the previous run's
+        records are checked; pages that come back 200 are stored in the cache,
+        so scraping them afterwards doesn't request them again.
+
+        Returns:
+            set: URLs answered with 304 Not Modified, whose previous records can be reused
+        """
+        candidates = [url for url in urls if url in previous_courses and fetcher.is_cached(url)]
+        results = await asyncio.gather(*[fetcher.fetch(url) for url in candidates])
+        return {url for url, (_, not_modified) in zip(candidates, results) if not_modified}
+
+    async def scrape_all_courses(self, jsonl_file="camosun_courses.jsonl"):
+        """
+        Scrape all courses from all paginated course listing pages, streaming
+        each course to a JSONL file (one JSON record per line) as it is scraped
+
+        Records are written in listing order to a temporary file that replaces
+        jsonl_file once the run finishes, so a crash mid-run leaves the previous
+        run's file in place and keeps every course up to the first unfinished one
+        in the temporary file. When a cache_file is set, the previous run's JSONL
+        file is used to skip courses whose pages are unchanged.
+
+        Returns:
+            int: Number of courses written
+        """
+        self.jsonl_file = jsonl_file
+        # With a cache, courses whose pages haven't changed since the last run
+        # are copied over from its records instead of being parsed again
+        previous_courses = self.load_previous_courses(jsonl_file) if self.cache_file else {}
+
+        # Write next to jsonl_file so the final rename stays on one filesystem
+        partial_file = jsonl_file + '.tmp'
+        with open(partial_file, 'w', encoding='utf-8') as fh, \
+                ProcessPoolExecutor(max_workers=self.parse_workers) as parse_pool:
+            async with self.create_fetcher() as fetcher:
+                all_course_links = await self.get_all_course_links(fetcher)
+
+                unchanged = {}
+                if previous_courses:
+                    fresh_urls = await self.validate_cache(
+                        fetcher, [course_link['url'] for course_link in all_course_links], previous_courses)
+                    unchanged = {url: previous_courses[url] for url in fresh_urls}
+                    logger.info("%d courses unchanged since the last run, %d to scrape",
+                                len(unchanged), len(all_course_links) - len(unchanged))
+
+                link_queue = asyncio.Queue()
+                for item in enumerate(all_course_links):
+                    link_queue.put_nowait(item)
+
+                # Now scrape each course with a pool of max_concurrency workers,
+                # handing finished courses to a single writer task
+                results_queue = asyncio.Queue()
+                writer = asyncio.create_task(
+                    write_ordered_jsonl(results_queue, fh, "courses", PROGRESS_LOG_EVERY, logger))
+                await asyncio.gather(*[
+                    self.course_worker(fetcher, link_queue, results_queue, parse_pool, unchanged)
+                    for _ in range(self.max_concurrency)
+                ])
+                await results_queue.put(None)
+                courses_written = await writer
+
+        os.replace(partial_file, jsonl_file)
+        logger.info("Wrote %d courses to %s", courses_written, jsonl_file)
+        return courses_written
+
+    def save_to_json(self, filename="camosun_courses.json", jsonl_file=None):
+        """
+        Save the scraped JSONL records to a single JSON file, one record at a time
+
+        Args:
+            filename (str): Path to the JSON file to write
+            jsonl_file (str, optional): JSONL file to convert, by default the one
+                written by the last scrape_all_courses call
+
+        Returns:
+            str: Path to the JSON file
+        """
+        jsonl_file = jsonl_file or self.jsonl_file
+        if jsonl_file is None:
+            # Nothing has been scraped, so save an empty list
+            logger.warning("No scraped courses to save, writing an empty list to %s", filename)
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write('[]')
+        else:
+            jsonl_to_json(jsonl_file, filename)
+        logger.info("Data saved to %s", filename)
         
         return filename
 
+def extract_course_details_worker(html_content, course_link):
+    """Parse a course page in a worker process (top-level so it can be pickled)"""
+    return CamosunCourseScraper.extract_course_details(html_content, course_link)
+
 def main():
     from utils.file_utils import ensure_directory_exists
     
@@ -204,14 +397,14 @@ def main():
     output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
     ensure_directory_exists(output_dir)
     
-    # Initialize and run the scraper
-    scraper = CamosunCourseScraper()
-    scraper.scrape_all_courses()
+    # Initialize and run the scraper, revalidating pages cached by previous runs
+    scraper = CamosunCourseScraper(cache_file=os.path.join(output_dir, "http_cache.db"))
+    asyncio.run(scraper.scrape_all_courses(os.path.join(output_dir, "camosun_courses.jsonl")))
     
     # Save the data
     output_file = os.path.join(output_dir, "camosun_courses.json")
     scraper.save_to_json(output_file)
-    logger.info(f"Scraping completed. Data saved to {output_file}")
+    logger.info("Scraping completed. Data saved to %s", output_file)
 
 if __name__ == "__main__":
     main()
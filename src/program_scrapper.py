@@ -1,54 +1,194 @@
-import requests
-from bs4 import BeautifulSoup
+import asyncio
+from lxml import etree
+from lxml import html as lxml_html
 import re
-import json
-import time
 import os
 import logging
 from urllib.parse import urljoin
 from utils.logger_config import setup_logger
 from utils.html_utils import clean_text
+from utils.fetcher import URLFetcher
+from utils.jsonl import write_ordered_jsonl, jsonl_to_json
 
 # Get logger from configuration
 logger = setup_logger("CamosunScraper")
 
+# Pages cached by an earlier run are reused without a request for this long
+CACHE_MAX_AGE = 7 * 24 * 3600
+
+# Longest tab text kept per field; real tabs stay well under 10k characters,
+# so anything longer means the page structure changed and swallowed more markup
+MAX_TEXT_LENGTH = 20_000
+
+# Progress is logged once per this many programs written, not once per program
+PROGRESS_LOG_EVERY = 25
+
+# Minimum seconds between requests to camosun.ca, unless robots.txt asks for more
+MIN_DOMAIN_DELAY = 1.5
+
+def _has_class(name):
+    """XPath predicate matching elements whose class attribute contains the given class"""
+    return f'contains(concat(" ", normalize-space(@class), " "), " {name} ")'
+
+# Compiled XPath expressions for listing pages, evaluated directly on the lxml tree
+_XP_PROGRAM_ROWS = etree.XPath(f'//div[{_has_class("views-row")}]')
+_XP_FIRST_LINK = etree.XPath('(.//a)[1]')
+
+# Tab ids of a program page
+_TAB_IDS = frozenset(('program_tab', 'more_tab', 'money_tab', 'admission_tab'))
+
+# Compiled XPath expressions for program pages
+_XP_GLANCE_TITLE = etree.XPath(f'(.//p[{_has_class("info-title")}])[1]')
+_XP_GLANCE_VALUE = etree.XPath(f'(.//p[not({_has_class("info-title")})])[1]')
+_XP_TAB_CONTENT = etree.XPath(
+    f'(.//div[not({_has_class("intro-text-about")}) and not({_has_class("image-about")})])[1]'
+)
+_XP_OUTLINE_BUTTON = etree.XPath(f'(.//a[{_has_class("button")} and {_has_class("cta_button")}])[1]')
+
+def _collect_program_sections(tree):
+    """
+    Find the top-level sections of a program page in a single document walk
+
+    Args:
+        tree (lxml.html.HtmlElement): Parsed program page
+
+    Returns:
+        tuple: (title element or None, intro element or None, list of glance
+            box elements, dict of tab elements keyed by id)
+    """
+    title_elem = intro_elem = None
+    glance_elements = []
+    tabs = {}
+    for elem in tree.iter(etree.Element):
+        elem_id = elem.get('id')
+        if elem_id in _TAB_IDS:
+            tabs.setdefault(elem_id, elem)
+
+        if elem.tag not in ('h1', 'div'):
+            continue
+        classes = elem.get('class')
+        if not classes:
+            continue
+        classes = classes.split()
+        if elem.tag == 'h1':
+            if title_elem is None and 'page_title' in classes:
+                title_elem = elem
+        else:
+            if intro_elem is None and 'intro-text' in classes:
+                intro_elem = elem
+            if 'program_glance__info' in classes:
+                glance_elements.append(elem)
+
+    return title_elem, intro_elem, glance_elements, tabs
+
+# Program data field for each glance box title, and for each outline table
+# header; labels are matched as substrings, in this order
+_GLANCE_FIELDS = {
+    "credential": "credential",
+    "work experience": "work_experience",
+    "study options": "study_options",
+    "open to international": "open_to_international",
+    "area of study": "area_of_study",
+    "length": "length",
+}
+_OUTLINE_FIELDS = {
+    "credential": "credential",
+    "total credits": "total_credits",
+    "program code": "program_code",
+    "cip": "cip",
+}
+
+def _match_field(label, fields):
+    """
+    Find the program data field for a lowercased label
+
+    Args:
+        label (str): Lowercased glance title or outline table header
+        fields (dict): Label keywords mapped to program data fields
+
+    Returns:
+        str: Program data field, or None if no keyword occurs in the label
+    """
+    # Most labels are exactly a keyword, which a single lookup settles
+    field = fields.get(label)
+    if field is not None:
+        return field
+    for keyword, field in fields.items():
+        if keyword in label:
+            return field
+    return None
+
+def _tab_text(elem, field, program_url):
+    """
+    Get the stripped text of a tab element, capped at MAX_TEXT_LENGTH characters
+
+    Args:
+        elem (lxml.html.HtmlElement): Tab or tab content element
+        field (str): Program data field the text is for, used in the warning
+        program_url (str): URL of the program page, used in the warning
+
+    Returns:
+        str: Tab text
+    """
+    text = elem.text_content().strip()
+    if len(text) > MAX_TEXT_LENGTH:
+        logger.warning("Truncating %s of %s from %d to %d characters, the page structure may have changed",
+                       field, program_url, len(text), MAX_TEXT_LENGTH)
+        text = text[:MAX_TEXT_LENGTH]
+    return text
+
+# Compiled XPath expressions for program outline pages
+_XP_OUTLINE_CONTAINERS = (
+    etree.XPath(f'(//*[{_has_class("block_content")}])[1]'),
+    etree.XPath('(//*[@id="gateway_container"])[1]'),
+    etree.XPath(f'(//div[{_has_class("main")}])[1]'),
+)
+_XP_OUTLINE_CELLS = etree.XPath(f'((.//*[{_has_class("program_description")}])[1]//table)[1]//td')
+_XP_CURRICULUM_ITEMS = etree.XPath(f'//*[{_has_class("acalog-core")}]//ul//li')
+
+# Matches curriculum entries like "COURSE 101 - Course Title (3 credits)"
+_COURSE_CODE_RE = re.compile(r'([A-Z]{2,5}\s*\d{3,4}[A-Z]?)\s*-?\s*(.*?)(?:\s*\((\d+\.?\d*)\s*credits?\))?$', re.IGNORECASE)
+
 class CamosunProgramScraper:
     """
     Scraper for Camosun College programs information.
     """
-    def __init__(self, base_url="https://camosun.ca", programs_url="/programs-courses/find-program"):
+    def __init__(self, base_url="https://camosun.ca", programs_url="/programs-courses/find-program",
+                 max_concurrency=5, requests_per_second=2, cache_file=None, cache_max_age=CACHE_MAX_AGE):
         self.base_url = base_url
         self.programs_url = urljoin(base_url, programs_url)
-        self.session = requests.Session()
         # Use a realistic user agent
         self.headers = {
             "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36"
         }
-        self.programs_data = []
-        
-    def get_page(self, url):
-        """Get page content from URL"""
-        try:
-            response = self.session.get(url, headers=self.headers)
-            response.raise_for_status()
-            return response.text
-        except requests.exceptions.RequestException as e:
-            logger.error(f"Error fetching page {url}: {str(e)}")
-            return None
+        # Number of pages fetched at the same time, and the overall request rate
+        self.max_concurrency = max_concurrency
+        self.requests_per_second = requests_per_second
+        # Optional on-disk page cache, so reruns and resumed runs read recent
+        # pages from disk instead of downloading them again
+        self.cache_file = cache_file
+        self.cache_max_age = cache_max_age
+        self.jsonl_file = None
+
+    def create_fetcher(self):
+        """Create the URLFetcher used for a scraping run"""
+        return URLFetcher(headers=self.headers, max_concurrency=self.max_concurrency,
+                          requests_per_second=self.requests_per_second, cache_file=self.cache_file,
+                          cache_max_age=self.cache_max_age, pool_maxsize=10, limit_per_host=5,
+                          respect_robots=True, min_domain_delay=MIN_DOMAIN_DELAY)
 
     def extract_program_links(self, html_content):
         """Extract all program links from the programs listing page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        tree = lxml_html.fromstring(html_content)
         program_links = []
         
         # Look for the program listings
-        views_rows = soup.select('div.views-row')
-        
-        for row in views_rows:
-            link = row.select_one('a')
-            if link and link.has_attr('href'):
-                program_url = urljoin(self.base_url, link['href'])
-                program_name = link.text.strip()
+        for row in _XP_PROGRAM_ROWS(tree):
+            link = _XP_FIRST_LINK(row)
+            if link and link[0].get('href') is not None:
+                link = link[0]
+                program_url = urljoin(self.base_url, link.get('href'))
+                program_name = link.text_content().strip()
                 program_links.append({
                     'name': program_name,
                     'url': program_url
@@ -56,7 +196,7 @@ class CamosunProgramScraper:
         
         return program_links
 
-    def get_all_program_links(self):
+    async def get_all_program_links(self, fetcher):
         """Get all program links from all pages"""
         all_program_links = []
         page = 0
@@ -64,9 +204,11 @@ class CamosunProgramScraper:
         
         while more_pages:
             page_url = f"{self.programs_url}?page=%2C{page}"
-            logger.info(f"Fetching programs from page {page}: {page_url}")
+            logger.info("Fetching programs from page %d: %s", page, page_url)
             
-            html_content = self.get_page(page_url)
+            # Listing pages are always checked with the server, so programs
+            # added since the last run are found within the cache's freshness window
+            html_content = await fetcher.get(page_url, revalidate=True)
             if not html_content:
                 break
                 
@@ -77,72 +219,70 @@ class CamosunProgramScraper:
             else:
                 all_program_links.extend(page_links)
                 page += 1
-                # Be nice to the server
-                time.sleep(1)
         
-        logger.info(f"Found {len(all_program_links)} program links in total")
+        logger.info("Found %d program links in total", len(all_program_links))
         return all_program_links
 
-    def get_program_outline_details(self, program_outline_url: str, program_data: dict):
+    async def get_program_outline_details(self, fetcher, program_outline_url: str, program_data: dict):
         """
         Get program outline details from the program outline page.
         """
-        html_content = self.get_page(program_outline_url)
-        soup = BeautifulSoup(html_content, 'lxml')
-
-        content_div = soup.select_one('.block_content') or soup.select_one('#gateway_container') or soup.select_one('div.main') or soup   
-        program_table = content_div.select_one('.program_description')
-        rows = program_table.select_one('table').select('td')
-        for i in range(0, len(rows), 2):
-            if i + 1 < len(rows):
-                # Extract the text from the first and second columns
-                header = clean_text(rows[i].get_text()).lower()
-                value = clean_text(rows[i + 1].get_text())
-
-                if 'credential' in header:
-                    program_data['credential'] = value
-                elif 'total credits' in header:
-                    program_data['total_credits'] = value
-                elif 'program code' in header:
-                    program_data['program_code'] = value
-                elif 'cip' in header:
-                    program_data['cip'] = value
+        html_content = await fetcher.get(program_outline_url)
+        if not html_content:
+            return program_data
+        tree = lxml_html.fromstring(html_content)
+
+        content_div = tree
+        for xpath in _XP_OUTLINE_CONTAINERS:
+            container = xpath(tree)
+            if container:
+                content_div = container[0]
+                break
+        # Cells alternate header, value; pair them up in one pass (a trailing
+        # unpaired cell is dropped by zip)
+        cells = iter(_XP_OUTLINE_CELLS(content_div))
+        for header_cell, value_cell in zip(cells, cells):
+            header = clean_text(header_cell.text_content()).lower()
+            value = clean_text(value_cell.text_content())
+
+            field = _match_field(header, _OUTLINE_FIELDS)
+            if field:
+                program_data[field] = value
         
         return program_data
 
 
-    def get_program_courses(self, url):
+    async def get_program_courses(self, fetcher, url):
         """
         Get all courses from a program page.
         
         Args:
+            fetcher (URLFetcher): Fetcher for the current scraping run
             url (str): URL of the program page
             
         Returns:
             list: List of course information dictionaries with code, title, and credits if available
         """
-        html_content = self.get_page(url)
-        soup = BeautifulSoup(html_content, 'lxml')
-        
-        courses_list = soup.select('.acalog-core ul li')
+        html_content = await fetcher.get(url)
+        if not html_content:
+            return []
+        tree = lxml_html.fromstring(html_content)
 
         courses = []
-        for element in courses_list:
-        # Check if the element is a list item
-            if element.name == 'li':
-                # Extract the text content
-                text = clean_text(element.text)
-                # Look for patterns like "COURSE 101 - Course Title (3 credits)"
-                course_match = re.match(r'([A-Z]{2,5}\s*\d{3,4}[A-Z]?)\s*-?\s*(.*?)(?:\s*\((\d+\.?\d*)\s*credits?\))?$', text, re.IGNORECASE)
-                if course_match:
-                    course_code = course_match.group(1).strip()
-                    course_title = course_match.group(2).strip()
-                    courses.append(f'{course_code} - {course_title}')
+        for element in _XP_CURRICULUM_ITEMS(tree):
+            # Extract the text content
+            text = clean_text(element.text_content())
+            # Look for patterns like "COURSE 101 - Course Title (3 credits)"
+            course_match = _COURSE_CODE_RE.match(text)
+            if course_match:
+                course_code = course_match.group(1).strip()
+                course_title = course_match.group(2).strip()
+                courses.append(f'{course_code} - {course_title}')
         return courses
     
-    def extract_program_details(self, html_content, program_url):
+    async def extract_program_details(self, fetcher, html_content, program_url):
         """Extract detailed information from a program page"""
-        soup = BeautifulSoup(html_content, 'html.parser')
+        tree = lxml_html.fromstring(html_content)
         
         program_data = {
             "url": program_url,
@@ -162,121 +302,158 @@ class CamosunProgramScraper:
             "admission_requirements": "",
         }
         
+        # Collect the title, intro, glance boxes and tabs from one document walk
+        title_elem, intro_elem, glance_elements, tabs = _collect_program_sections(tree)
+
         # Extract program title
-        title_elem = soup.select_one('h1.page_title')
-        if title_elem:
-            program_data["title"] = title_elem.text.strip()
+        if title_elem is not None:
+            program_data["title"] = title_elem.text_content().strip()
         
         # Extract intro text
-        intro_elem = soup.select_one('div.intro-text')
-        if intro_elem:
-            program_data["intro_text"] = intro_elem.text.strip()
+        if intro_elem is not None:
+            program_data["intro_text"] = intro_elem.text_content().strip()
         
         # Extract program at a glance info
-        glance_elements = soup.select('div.program_glance__info')
         for elem in glance_elements:
-            title_elem = elem.select_one('p.info-title')
+            title_elem = _XP_GLANCE_TITLE(elem)
             if not title_elem:
                 continue
                 
-            title = title_elem.text.strip().lower()
-            value_elem = elem.select_one('p:not(.info-title)')
+            title = title_elem[0].text_content().strip().lower()
+            value_elem = _XP_GLANCE_VALUE(elem)
             
             if value_elem:
-                value = value_elem.text.strip()
+                value = value_elem[0].text_content().strip()
                 
-                if "credential" in title:
-                    program_data["credential"] = value
-                elif "work experience" in title:
-                    program_data["work_experience"] = value
-                elif "study options" in title:
-                    program_data["study_options"] = value
-                elif "open to international" in title:
-                    program_data["open_to_international"] = value
-                elif "area of study" in title:
-                    program_data["area_of_study"] = value
-                elif "length" in title:
-                    program_data["length"] = value
+                field = _match_field(title, _GLANCE_FIELDS)
+                if field:
+                    program_data[field] = value
         
-        # Extract tab content
         # Overview tab
-        overview_tab = soup.select_one('#program_tab')
-        if overview_tab:
-            overview_content = overview_tab.select_one('div:not(.intro-text-about):not(.image-about)')
+        overview_tab = tabs.get('program_tab')
+        if overview_tab is not None:
+            overview_content = _XP_TAB_CONTENT(overview_tab)
             if overview_content:
-                program_data["overview"] = overview_content.text.strip()
+                program_data["overview"] = _tab_text(overview_content[0], "overview", program_url)
         
         # What you'll learn tab
-        learn_tab = soup.select_one('#more_tab')
-        if learn_tab:
-            learn_content = learn_tab.select_one('div:not(.intro-text-about):not(.image-about)')
+        learn_tab = tabs.get('more_tab')
+        if learn_tab is not None:
+            learn_content = _XP_TAB_CONTENT(learn_tab)
             program_outline_link = None
             if learn_content:
                 # Find the program outline button link if it exists
-                outline_button = learn_content.select_one('a.button.cta_button')
-                if outline_button and outline_button.has_attr('href'):
-                    program_outline_link = urljoin(self.base_url, outline_button['href'])
+                outline_button = _XP_OUTLINE_BUTTON(learn_content[0])
+                if outline_button and outline_button[0].get('href') is not None:
+                    program_outline_link = urljoin(self.base_url, outline_button[0].get('href'))
                     program_data["program_outline_url"] = program_outline_link
-                    program_data["curriculum"] = self.get_program_courses(program_outline_link)
-                    program_data = self.get_program_outline_details(program_outline_link, program_data)
+                    # Both read the outline page; requested together, they share one download
+                    program_data["curriculum"], program_data = await asyncio.gather(
+                        self.get_program_courses(fetcher, program_outline_link),
+                        self.get_program_outline_details(fetcher, program_outline_link, program_data)
+                    )
         
         # Tuition tab
-        money_tab = soup.select_one('#money_tab')
-        if money_tab:
-            program_data["tuition_info"] = money_tab.text.strip()
+        money_tab = tabs.get('money_tab')
+        if money_tab is not None:
+            program_data["tuition_info"] = _tab_text(money_tab, "tuition_info", program_url)
         
         # Admission tab
-        admission_tab = soup.select_one('#admission_tab')
-        if admission_tab:
-            program_data["admission_requirements"] = admission_tab.text.strip()
+        admission_tab = tabs.get('admission_tab')
+        if admission_tab is not None:
+            program_data["admission_requirements"] = _tab_text(admission_tab, "admission_requirements", program_url)
         
         return program_data
     
-    def scrape_program(self, program_link):
+    async def scrape_program(self, fetcher, program_link):
         """Scrape detailed info for a single program"""
-        logger.info(f"Scraping program: {program_link['name']}")
+        logger.debug("Scraping program: %s", program_link['name'])
         
-        html_content = self.get_page(program_link['url'])
+        html_content = await fetcher.get(program_link['url'])
         if not html_content:
             return None
         
-        program_data = self.extract_program_details(html_content, program_link['url'])
+        program_data = await self.extract_program_details(fetcher, html_content, program_link['url'])
         # Add name from the program list for consistency
         #program_data["name"] = program_link['name']
         
         return program_data
 
-    def scrape_all_programs(self):
-        """Scrape all programs"""
-        # Get all program links
-        program_links = self.get_all_program_links()
-        
-        for i, program_link in enumerate(program_links):
+    async def program_worker(self, fetcher, link_queue, results_queue):
+        """Scrape programs from the link queue until it is empty, queueing the results"""
+        while True:
             try:
-                logger.info(f"Processing program {i+1}/{len(program_links)}: {program_link['name']}")
-                
-                # Check if we already have data for this program
-                program_data = self.scrape_program(program_link)
-                
-                if program_data:
-                    self.programs_data.append(program_data)
-                
-                # Be nice to the server
-                time.sleep(2)
+                index, program_link = link_queue.get_nowait()
+            except asyncio.QueueEmpty:
+                return
+
+            program_data = None
+            try:
+                program_data = await self.scrape_program(fetcher, program_link)
             except Exception as e:
-                logger.error(f"Error processing program {program_link['name']}: {str(e)}")
-        
-        return self.programs_data
-    
-    def save_to_json(self, filename="camosun_programs.json"):
-        """Save scraped data to a JSON file"""
-        with open(filename, 'w', encoding='utf-8') as f:
-            json.dump(self.programs_data, f, ensure_ascii=False, indent=2)
-        logger.info(f"Data saved to {filename}")
+                logger.error("Error processing program %s: %s", program_link['name'], e)
+            await results_queue.put((index, program_data))
+
+    async def scrape_all_programs(self, jsonl_file="camosun_programs.jsonl"):
+        """
+        Scrape all programs, streaming each program to a JSONL file (one JSON
+        record per line) as it is scraped
+
+        Records are written in listing order, so a crash mid-run keeps every
+        program up to the first unfinished one.
+
+        Returns:
+            int: Number of programs written
+        """
+        self.jsonl_file = jsonl_file
+        with open(jsonl_file, 'w', encoding='utf-8') as fh:
+            async with self.create_fetcher() as fetcher:
+                # Get all program links
+                program_links = await self.get_all_program_links(fetcher)
+
+                link_queue = asyncio.Queue()
+                for item in enumerate(program_links):
+                    link_queue.put_nowait(item)
+
+                # Scrape programs with a pool of max_concurrency workers, handing
+                # finished programs to a single writer task
+                results_queue = asyncio.Queue()
+                writer = asyncio.create_task(
+                    write_ordered_jsonl(results_queue, fh, "programs", PROGRESS_LOG_EVERY, logger))
+                await asyncio.gather(*[
+                    self.program_worker(fetcher, link_queue, results_queue)
+                    for _ in range(self.max_concurrency)
+                ])
+                await results_queue.put(None)
+                programs_written = await writer
+
+        logger.info("Wrote %d programs to %s", programs_written, jsonl_file)
+        return programs_written
+
+    def save_to_json(self, filename="camosun_programs.json", jsonl_file=None):
+        """
+        Save the scraped JSONL records to a single JSON file, one record at a time
+
+        Args:
+            filename (str): Path to the JSON file to write
+            jsonl_file (str, optional): JSONL file to convert, by default the one
+                written by the last scrape_all_programs call
+
+        Returns:
+            str: Path to the JSON file
+        """
+        jsonl_file = jsonl_file or self.jsonl_file
+        if jsonl_file is None:
+            # Nothing has been scraped, so save an empty list
+            logger.warning("No scraped programs to save, writing an empty list to %s", filename)
+            with open(filename, 'w', encoding='utf-8') as f:
+                f.write('[]')
+        else:
+            jsonl_to_json(jsonl_file, filename)
+        logger.info("Data saved to %s", filename)
         
         return filename
 
-
 def main():
     from utils.file_utils import ensure_directory_exists
     
@@ -284,14 +461,14 @@ def main():
     output_dir = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data")
     ensure_directory_exists(output_dir)
     
-    # Initialize and run the scraper
-    scraper = CamosunProgramScraper()
-    scraper.scrape_all_programs()
+    # Initialize and run the scraper, reusing pages cached by recent runs
+    scraper = CamosunProgramScraper(cache_file=os.path.join(output_dir, "program_http_cache.db"))
+    asyncio.run(scraper.scrape_all_programs(os.path.join(output_dir, "camosun_programs.jsonl")))
     
     # Save the data
     output_file = os.path.join(output_dir, "camosun_programs.json")
     scraper.save_to_json(output_file)
-    logger.info(f"Scraping completed. Data saved to {output_file}")
+    logger.info("Scraping completed. Data saved to %s", output_file)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -5,6 +5,10 @@ Utility modules for the University Scraper project
 from .logger_config import setup_logger
 from .file_utils import ensure_directory_exists, clean_directory, backup_file
 from .html_utils import clean_text, extract_text_from_element, get_absolute_url, extract_table_as_dict
+from .http_cache import HttpCache
+from .rate_limit import AsyncRateLimiter, DomainThrottle, parse_retry_after
+from .fetcher import URLFetcher
+from .jsonl import dumps_indented, write_ordered_jsonl, jsonl_to_json
 
 __all__ = [
     'setup_logger',
@@ -15,4 +19,12 @@ __all__ = [
     'extract_text_from_element',
     'get_absolute_url',
     'extract_table_as_dict',
+    'HttpCache',
+    'AsyncRateLimiter',
+    'DomainThrottle',
+    'parse_retry_after',
+    'URLFetcher',
+    'dumps_indented',
+    'write_ordered_jsonl',
+    'jsonl_to_json',
 ]
@@ -0,0 +1,248 @@
+"""
+Shared asynchronous page fetcher for the scrapers
+"""
+
+import asyncio
+import logging
+from urllib.parse import urlsplit
+from urllib.robotparser import RobotFileParser
+
+import aiohttp
+
+from .http_cache import HttpCache
+from .rate_limit import AsyncRateLimiter, DomainThrottle, parse_retry_after
+
+logger = logging.getLogger(__name__)
+
+# Responses worth retrying: rate limiting and transient gateway errors
+RETRY_STATUSES = {429, 502, 503, 504}
+
+class URLFetcher:
+    """
+    Fetches pages over one pooled aiohttp session.
+
+    Requests are bounded by a semaphore and paced by an AsyncRateLimiter,
+    transient errors are retried with exponential backoff, and pages can be
+    revalidated against an on-disk HttpCache. Concurrent requests for the same
+    URL share a single download, and a cached page that was already fetched or
+    revalidated during this run is served from the cache without a request.
+
+    With cache_max_age set, every successful page is cached, and pages cached
+    less than cache_max_age seconds ago are served without a request, so an
+    interrupted or repeated run only downloads what it doesn't have yet. Pages
+    that change often, such as listings, can be fetched with revalidate=True
+    to check them with the server anyway.
+
+    With respect_robots set, each site's robots.txt is read once per run;
+    disallowed pages are skipped, and its Crawl-delay (or min_domain_delay,
+    whichever is larger) is kept between requests to the same host.
+
+    Use as an async context manager:
+
+        async with URLFetcher(headers=headers) as fetcher:
+            html_content = await fetcher.get(url)
+    """
+    def __init__(self, headers=None, max_concurrency=8, requests_per_second=5, cache_file=None,
+                 cache_max_age=None, pool_maxsize=32, limit_per_host=0, max_retries=5, backoff_factor=1.0,
+                 respect_robots=False, min_domain_delay=0.0):
+        self.headers = headers or {}
+        self.max_concurrency = max_concurrency
+        self.rate_limiter = AsyncRateLimiter(rate=requests_per_second)
+        self.cache_file = cache_file
+        self.cache_max_age = cache_max_age
+        # Pooled keep-alive connections overall and per host (0 means no per-host limit)
+        self.pool_maxsize = pool_maxsize
+        self.limit_per_host = limit_per_host
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+        self.respect_robots = respect_robots
+        self.throttle = DomainThrottle(min_domain_delay)
+        self.session = None
+        self.cache = None
+        self._sem = None
+        self._in_flight = {}
+        self._current = set()
+        self._robots = {}
+
+    async def __aenter__(self):
+        if self.cache_file:
+            self.cache = HttpCache(self.cache_file)
+        self._sem = asyncio.Semaphore(self.max_concurrency)
+        connector = aiohttp.TCPConnector(limit=self.pool_maxsize, limit_per_host=self.limit_per_host,
+                                         ttl_dns_cache=300)
+        self.session = aiohttp.ClientSession(headers=self.headers, connector=connector)
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, tb):
+        await self.session.close()
+        self.session = None
+        if self.cache:
+            self.cache.close()
+            self.cache = None
+        return False
+
+    def is_cached(self, url):
+        """Return True if the URL has an entry in the on-disk cache"""
+        return self.cache is not None and url in self.cache
+
+    async def get(self, url, revalidate=False):
+        """
+        Get raw page bytes from URL
+
+        Args:
+            url (str): Page URL
+            revalidate (bool): Check a cached page with the server even if it
+                is within cache_max_age
+
+        Returns:
+            bytes: Page content, or None if the page couldn't be fetched
+        """
+        content, _ = await self.fetch(url, revalidate)
+        return content
+
+    async def fetch(self, url, revalidate=False):
+        """
+        Get raw page bytes from URL, along with whether the cached copy was still current
+
+        Args:
+            url (str): Page URL
+            revalidate (bool): Check a cached page with the server even if it
+                is within cache_max_age
+
+        Returns:
+            tuple: (content, not_modified) where content is None if the page couldn't
+                be fetched and not_modified is True if the server answered 304
+        """
+        future = self._in_flight.get(url)
+        if future is None:
+            future = asyncio.ensure_future(self._fetch(url, revalidate))
+            self._in_flight[url] = future
+            future.add_done_callback(lambda _: self._in_flight.pop(url, None))
+        return await asyncio.shield(future)
+
+    async def robots_for(self, url):
+        """
+        Get the robots.txt rules of the site a URL belongs to, loading them once per run
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            RobotFileParser: Parsed rules, or None if robots.txt is not respected
+        """
+        if not self.respect_robots:
+            return None
+
+        parts = urlsplit(url)
+        origin = f"{parts.scheme}://{parts.netloc}"
+        future = self._robots.get(origin)
+        if future is None:
+            future = asyncio.ensure_future(self._load_robots(origin))
+            self._robots[origin] = future
+        return await asyncio.shield(future)
+
+    async def _load_robots(self, origin):
+        """
+        Fetch and parse robots.txt
+
+        Follows RFC 9309: a 4xx response other than 401, 403 or 429 means there
+        are no rules, while 401/403, or a robots.txt that stays unreachable
+        (network errors, 429 or 5xx after retries), disallows the whole site.
+        """
+        robots_url = f"{origin}/robots.txt"
+        robots = RobotFileParser(robots_url)
+        response = await self._request(robots_url)
+        if response is None:
+            logger.error("Couldn't read %s, treating every page of the site as disallowed", robots_url)
+            robots.disallow_all = True
+            return robots
+
+        status, _, body = response
+        if status in (401, 403):
+            robots.disallow_all = True
+        elif status == 429 or status >= 500:
+            logger.error("Got HTTP %d for %s, treating every page of the site as disallowed",
+                         status, robots_url)
+            robots.disallow_all = True
+        elif status >= 400:
+            robots.allow_all = True
+        else:
+            robots.parse(body.decode('utf-8', errors='replace').splitlines())
+        return robots
+
+    async def _request(self, url, headers=None, crawl_delay=None):
+        """
+        Send a GET request, retrying transient failures with exponential backoff
+
+        Args:
+            url (str): URL to request
+            headers (dict): Extra request headers
+            crawl_delay (float): Minimum delay between requests to the URL's host
+
+        Returns:
+            tuple: (status, response headers, body) of the final response, body
+                being None for 304 and error responses; or None if the server
+                couldn't be reached
+        """
+        host = urlsplit(url).netloc
+        async with self._sem:
+            for attempt in range(self.max_retries + 1):
+                await self.rate_limiter.acquire()
+                await self.throttle.wait(host, crawl_delay)
+                retry_after = None
+                try:
+                    async with self.session.get(url, headers=headers) as response:
+                        self.rate_limiter.update_from_headers(response.headers)
+                        if response.status in RETRY_STATUSES and attempt < self.max_retries:
+                            logger.warning("Got HTTP %d for %s, retrying", response.status, url)
+                            retry_after = parse_retry_after(response.headers.get('Retry-After'))
+                        else:
+                            body = None
+                            if response.status != 304 and response.status < 400:
+                                # Leave charset detection to the parser, which reads the <meta> tag in C
+                                body = await response.read()
+                            return response.status, response.headers, body
+                except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                    if attempt == self.max_retries:
+                        logger.error("Error fetching %s: %s", url, e)
+                        return None
+                    logger.warning("Error fetching %s: %s, retrying", url, e)
+
+                backoff = self.backoff_factor * 2 ** attempt
+                await asyncio.sleep(max(backoff, retry_after or 0))
+
+    async def _fetch(self, url, revalidate=False):
+        """Fetch a page, serving it from the cache when possible"""
+        if self.cache:
+            if url in self._current:
+                entry = self.cache.get(url)
+            else:
+                entry = self.cache.get_fresh(url, None if revalidate else self.cache_max_age)
+            if entry:
+                return entry['body'], False
+
+        robots = await self.robots_for(url)
+        user_agent = self.headers.get('User-Agent', '*')
+        if robots and not robots.can_fetch(user_agent, url):
+            logger.warning("Skipping page disallowed by robots.txt: %s", url)
+            return None, False
+        crawl_delay = robots.crawl_delay(user_agent) if robots else None
+
+        headers = self.cache.conditional_headers(url) if self.cache else {}
+        response = await self._request(url, headers, crawl_delay)
+        if response is None:
+            return None, False
+
+        status, response_headers, html_content = response
+        if status == 304 and headers:
+            logger.debug("Not modified, using cached page: %s", url)
+            entry = self.cache.refresh(url, response_headers)
+            self._current.add(url)
+            return entry['body'], True
+        if status >= 400:
+            logger.error("Error fetching page %s: HTTP %d", url, status)
+            return None, False
+        if self.cache and self.cache.store(url, response_headers, html_content,
+                                           require_validators=self.cache_max_age is None):
+            self._current.add(url)
+        return html_content, False
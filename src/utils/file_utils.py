@@ -20,7 +20,7 @@ def ensure_directory_exists(directory_path):
     """
     if not os.path.exists(directory_path):
         os.makedirs(directory_path)
-        logger.info(f"Created directory: {directory_path}")
+        logger.info("Created directory: %s", directory_path)
     return directory_path
 
 def clean_directory(directory_path, exclude=None):
@@ -37,27 +37,49 @@ def clean_directory(directory_path, exclude=None):
     exclude = exclude or []
     
     if not os.path.exists(directory_path):
-        logger.warning(f"Directory does not exist: {directory_path}")
+        logger.warning("Directory does not exist: %s", directory_path)
         return False
     
     try:
-        for item in os.listdir(directory_path):
-            item_path = os.path.join(directory_path, item)
-            
-            if item in exclude:
-                continue
-                
-            if os.path.isdir(item_path):
-                shutil.rmtree(item_path)
-            else:
-                os.remove(item_path)
-                
-        logger.info(f"Cleaned directory: {directory_path}")
+        # scandir reports each entry's type from the directory listing itself,
+        # so no extra stat call is made per entry
+        with os.scandir(directory_path) as entries:
+            for entry in entries:
+                if entry.name in exclude:
+                    continue
+
+                # Symlinks are unlinked, never followed into their target
+                if entry.is_dir(follow_symlinks=False):
+                    shutil.rmtree(entry.path)
+                else:
+                    os.remove(entry.path)
+
+        logger.info("Cleaned directory: %s", directory_path)
         return True
     except Exception as e:
-        logger.error(f"Error cleaning directory {directory_path}: {str(e)}")
+        logger.error("Error cleaning directory %s: %s", directory_path, e)
         return False
 
+def _copy_file_range(src_path, dst_path):
+    """
+    Copy a file's contents in the kernel with os.copy_file_range, which
+    filesystems such as btrfs and XFS turn into an instant copy-on-write clone
+
+    Raises:
+        OSError: If the kernel or filesystem can't copy between the two files
+    """
+    with open(src_path, 'rb') as src, open(dst_path, 'wb') as dst:
+        remaining = os.fstat(src.fileno()).st_size
+        while remaining > 0:
+            # The kernel may copy less than asked for, so loop until done
+            copied = os.copy_file_range(src.fileno(), dst.fileno(), remaining)
+            if copied == 0:
+                break
+            remaining -= copied
+        if remaining > 0:
+            # Source shrank, or the filesystem stopped copying early
+            raise OSError(f"copy_file_range stopped with {remaining} bytes left to copy")
+
 def backup_file(file_path, backup_dir=None):
     """
     Create a backup copy of a file
@@ -70,7 +92,7 @@ def backup_file(file_path, backup_dir=None):
         str: Path to backup file if successful, None otherwise
     """
     if not os.path.exists(file_path):
-        logger.warning(f"File does not exist: {file_path}")
+        logger.warning("File does not exist: %s", file_path)
         return None
     
     try:
@@ -81,9 +103,17 @@ def backup_file(file_path, backup_dir=None):
         else:
             backup_path = file_path + ".bak"
             
-        shutil.copy2(file_path, backup_path)
-        logger.info(f"Created backup: {backup_path}")
+        if hasattr(os, 'copy_file_range'):
+            try:
+                _copy_file_range(file_path, backup_path)
+                shutil.copystat(file_path, backup_path)
+            except OSError:
+                # e.g. no kernel support, or source and backup on different filesystems
+                shutil.copy2(file_path, backup_path)
+        else:
+            shutil.copy2(file_path, backup_path)
+        logger.info("Created backup: %s", backup_path)
         return backup_path
     except Exception as e:
-        logger.error(f"Error backing up file {file_path}: {str(e)}")
+        logger.error("Error backing up file %s: %s", file_path, e)
         return None
@@ -2,9 +2,9 @@
 HTML parsing utilities for the scraper
 """
 
-import re
 from bs4 import BeautifulSoup
-from urllib.parse import urljoin, urlparse
+from functools import lru_cache
+from urllib.parse import urljoin
 import logging
 
 logger = logging.getLogger(__name__)
@@ -14,9 +14,9 @@ def clean_text(text):
     if not text:
         return ""
     
-    # Replace multiple spaces and line breaks with a single space
-    text = re.sub(r'\s+', ' ', text)
-    return text.strip()
+    # Replace multiple spaces and line breaks with a single space; str.split()
+    # with no separator also drops leading and trailing whitespace
+    return ' '.join(text.split())
 
 def extract_text_from_element(element):
     """
@@ -33,6 +33,8 @@ def extract_text_from_element(element):
         
     return clean_text(element.get_text())
 
+# The same navigation links and buttons repeat on every page of a site
+@lru_cache(maxsize=4096)
 def get_absolute_url(base_url, relative_url):
     """
     Convert a relative URL to an absolute URL
@@ -47,11 +49,7 @@ def get_absolute_url(base_url, relative_url):
     if not relative_url:
         return None
         
-    # Check if URL is already absolute
-    if bool(urlparse(relative_url).netloc):
-        return relative_url
-        
-    # Join base URL and relative URL
+    # Join base URL and relative URL; urljoin returns absolute URLs unchanged
     return urljoin(base_url, relative_url)
 
 def extract_table_as_dict(table_element):
@@ -0,0 +1,146 @@
+"""
+On-disk HTTP cache used to make conditional requests for unchanged pages
+"""
+
+import os
+import time
+import shelve
+import logging
+
+from .file_utils import ensure_directory_exists
+
+logger = logging.getLogger(__name__)
+
+class HttpCache:
+    """
+    Persistent store of page bodies keyed by URL, together with the ETag and
+    Last-Modified validators the server sent for them.
+
+    By default only responses carrying at least one validator are stored, since
+    those are the only ones that can later be revalidated with a 304 Not
+    Modified. Every entry also records when it was stored, so a caller can
+    serve recent entries without contacting the server at all (see `get_fresh`).
+    """
+    def __init__(self, cache_file):
+        cache_dir = os.path.dirname(cache_file)
+        if cache_dir:
+            ensure_directory_exists(cache_dir)
+        self.cache_file = cache_file
+        self._db = shelve.open(cache_file)
+
+    def get(self, url):
+        """
+        Get the cached entry for a URL
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            dict: Entry with 'etag', 'last_modified', 'stored_at' and 'body' keys,
+                or None if not cached
+        """
+        return self._db.get(url)
+
+    def __contains__(self, url):
+        return url in self._db
+
+    def get_fresh(self, url, max_age):
+        """
+        Get the cached entry for a URL if it was stored less than max_age seconds ago
+
+        Args:
+            url (str): Page URL
+            max_age (float): Maximum entry age in seconds, or None to never treat
+                entries as fresh
+
+        Returns:
+            dict: Cached entry, or None if not cached or too old to use without
+                contacting the server
+        """
+        if max_age is None:
+            return None
+        entry = self.get(url)
+        # Entries written before 'stored_at' existed are always revalidated
+        if entry is None or time.time() - entry.get('stored_at', 0) >= max_age:
+            return None
+        return entry
+
+    def conditional_headers(self, url):
+        """
+        Build If-None-Match / If-Modified-Since headers for a cached URL
+
+        Args:
+            url (str): Page URL
+
+        Returns:
+            dict: Request headers, empty if the URL is not cached
+        """
+        entry = self.get(url)
+        headers = {}
+        if entry:
+            if entry['etag']:
+                headers['If-None-Match'] = entry['etag']
+            if entry['last_modified']:
+                headers['If-Modified-Since'] = entry['last_modified']
+        return headers
+
+    def store(self, url, response_headers, body, require_validators=True):
+        """
+        Store a page body along with its validators
+
+        Args:
+            url (str): Page URL
+            response_headers (Mapping): Headers of the 200 response
+            body (bytes): Raw page content
+            require_validators (bool): Skip responses without an ETag or
+                Last-Modified header, which can't be revalidated later
+
+        Returns:
+            bool: True if the page was cached, False if it had no validators
+        """
+        etag = response_headers.get('ETag')
+        last_modified = response_headers.get('Last-Modified')
+        if require_validators and not etag and not last_modified:
+            return False
+
+        self._db[url] = {
+            'etag': etag,
+            'last_modified': last_modified,
+            'stored_at': time.time(),
+            'body': body,
+        }
+        return True
+
+    def refresh(self, url, response_headers):
+        """
+        Mark a cached page as revalidated after a 304 Not Modified response
+
+        Restarts the entry's freshness window, and takes over any new validators
+        the server sent with the 304.
+
+        Args:
+            url (str): Page URL
+            response_headers (Mapping): Headers of the 304 response
+
+        Returns:
+            dict: The updated entry, or None if the URL is not cached
+        """
+        entry = self.get(url)
+        if entry is None:
+            return None
+        entry['etag'] = response_headers.get('ETag') or entry['etag']
+        entry['last_modified'] = response_headers.get('Last-Modified') or entry['last_modified']
+        entry['stored_at'] = time.time()
+        self._db[url] = entry
+        return entry
+
+    def close(self):
+        """Flush the cache to disk and close it"""
+        self._db.close()
+        logger.info("Closed HTTP cache: %s", self.cache_file)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, tb):
+        self.close()
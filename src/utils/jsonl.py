@@ -0,0 +1,89 @@
+"""
+JSON Lines utilities for the scrapers' streamed output
+"""
+
+import json
+import logging
+
+try:
+    import orjson
+except ImportError:  # orjson is optional; fall back to the standard library
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+def dumps_indented(json_line):
+    """
+    Re-serialize one JSONL record as indented JSON, with orjson when available
+
+    Args:
+        json_line (bytes): One line of a JSONL file
+
+    Returns:
+        bytes: The record as UTF-8 JSON indented by 2 spaces, non-ASCII kept as is
+    """
+    if orjson is not None:
+        return orjson.dumps(orjson.loads(json_line), option=orjson.OPT_INDENT_2)
+    return json.dumps(json.loads(json_line), ensure_ascii=False, indent=2).encode('utf-8')
+
+async def write_ordered_jsonl(queue, fh, label="records", progress_every=0, progress_logger=None):
+    """
+    Write records from a queue to a JSONL file in their original order
+
+    Queue items are (index, record) tuples, record being None for items that
+    failed; a bare None marks the end of the queue. Records can arrive in any
+    order and each one is held back until every record before it is written.
+
+    Args:
+        queue (asyncio.Queue): Queue of (index, record) tuples
+        fh (file): JSONL file opened for writing text
+        label (str): What the records are, for progress messages
+        progress_every (int): Log progress once per this many records written, 0 for never
+        progress_logger (logging.Logger): Logger for progress messages, this module's by default
+
+    Returns:
+        int: Number of records written
+    """
+    progress_logger = progress_logger or logger
+    pending = {}
+    next_index = 0
+    records_written = 0
+    while True:
+        item = await queue.get()
+        if item is None:
+            return records_written
+
+        index, record = item
+        pending[index] = record
+        while next_index in pending:
+            record = pending.pop(next_index)
+            next_index += 1
+            if record:
+                fh.write(json.dumps(record, ensure_ascii=False) + '\n')
+                records_written += 1
+                if progress_every and records_written % progress_every == 0:
+                    progress_logger.info("Scraped %d %s so far", records_written, label)
+        fh.flush()
+
+def jsonl_to_json(jsonl_file, json_file):
+    """
+    Convert a JSONL file into a JSON array file, one record at a time
+
+    The output has the same layout as dumping the whole list with indent=2,
+    without loading every record into memory.
+
+    Args:
+        jsonl_file (str): Path to the JSONL file to read
+        json_file (str): Path to the JSON file to write
+
+    Returns:
+        int: Number of records converted
+    """
+    records = 0
+    with open(jsonl_file, 'rb') as src, open(json_file, 'wb') as f:
+        f.write(b'[')
+        for line in src:
+            f.write((b',\n  ' if records else b'\n  ') + dumps_indented(line).replace(b'\n', b'\n  '))
+            records += 1
+        f.write(b'\n]' if records else b']')
+    return records
@@ -0,0 +1,144 @@
+"""
+Request rate limiting utilities for the scrapers
+"""
+
+import asyncio
+import time
+import logging
+from email.utils import parsedate_to_datetime
+
+logger = logging.getLogger(__name__)
+
+def parse_retry_after(value):
+    """
+    Parse a Retry-After header value
+
+    Args:
+        value (str): Header value, either a number of seconds or an HTTP date
+
+    Returns:
+        float: Seconds to wait, or None if the value can't be parsed
+    """
+    if not value:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        retry_at = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+class AsyncRateLimiter:
+    """
+    Token bucket limiter for asyncio scrapers.
+
+    Allows bursts of up to `rate` requests and refills at `rate` tokens per
+    `period` seconds. The server can slow the bucket down through its
+    Retry-After and X-RateLimit-* response headers, see `update_from_headers`.
+    """
+    def __init__(self, rate=5, period=1.0):
+        self.rate = rate
+        self.period = period
+        self._tokens = float(rate)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lock = asyncio.Lock()
+
+    def _refill(self, now):
+        elapsed = now - self._updated
+        self._tokens = min(float(self.rate), self._tokens + elapsed * self.rate / self.period)
+        self._updated = now
+
+    async def acquire(self):
+        """Wait until a request may be sent"""
+        async with self._lock:
+            while True:
+                now = time.monotonic()
+                if now < self._paused_until:
+                    await asyncio.sleep(self._paused_until - now)
+                    continue
+
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) * self.period / self.rate)
+
+    def pause(self, seconds):
+        """
+        Hold back all requests for the given number of seconds
+
+        Args:
+            seconds (float): How long to pause
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update_from_headers(self, headers):
+        """
+        Pause the limiter if the server asked clients to back off
+
+        Honours Retry-After, and X-RateLimit-Reset once X-RateLimit-Remaining
+        reaches zero. X-RateLimit-Reset is read as an epoch timestamp when it is
+        that large, and as a number of seconds otherwise.
+
+        Args:
+            headers (Mapping): Response headers
+        """
+        retry_after = parse_retry_after(headers.get('Retry-After'))
+        if retry_after:
+            logger.warning("Server asked to retry after %.1fs, pausing requests", retry_after)
+            self.pause(retry_after)
+            return
+
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        if remaining is None or reset is None:
+            return
+
+        try:
+            remaining = int(remaining)
+            reset = float(reset)
+        except ValueError:
+            return
+
+        if remaining <= 0:
+            wait = reset - time.time() if reset > 1e9 else reset
+            if wait > 0:
+                logger.warning("Rate limit exhausted, pausing requests for %.1fs", wait)
+                self.pause(wait)
+
+class DomainThrottle:
+    """
+    Enforces a minimum delay between the starts of consecutive requests to
+    the same host, measured from when the previous request actually started,
+    so no time is lost when the previous request was already slow.
+    """
+    def __init__(self, min_delay=0.0):
+        self.min_delay = min_delay
+        self._last_request = {}
+        self._locks = {}
+
+    async def wait(self, host, delay=None):
+        """
+        Wait until a request to the host may be sent
+
+        Args:
+            host (str): Host name (with port, if any) the request goes to
+            delay (float): Minimum delay for this host, if larger than min_delay
+                (e.g. a robots.txt Crawl-delay)
+        """
+        delay = max(self.min_delay, delay or 0)
+        if not delay:
+            return
+
+        lock = self._locks.setdefault(host, asyncio.Lock())
+        async with lock:
+            wait = self._last_request.get(host, float('-inf')) + delay - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)
+            self._last_request[host] = time.monotonic()
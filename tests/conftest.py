@@ -0,0 +1,13 @@
+"""
+Shared pytest setup: make the scraper modules under src/ and the test
+helpers under tests/ importable
+"""
+
+import os
+import sys
+
+TESTS_DIR = os.path.dirname(os.path.abspath(__file__))
+SRC_DIR = os.path.join(os.path.dirname(TESTS_DIR), 'src')
+for path in (SRC_DIR, TESTS_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
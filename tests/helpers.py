@@ -0,0 +1,65 @@
+"""
+Local aiohttp test server and page handlers shared by the fetcher and scraper tests
+"""
+
+import asyncio
+
+from aiohttp import web
+from aiohttp.test_utils import TestServer
+
+from utils.fetcher import URLFetcher
+
+PAGE = b'<html><body>page</body></html>'
+
+def page(etag='"v1"', delay=0):
+    """Handler serving PAGE with an ETag, answering 304 when the client already has it"""
+    async def handler(request):
+        if delay:
+            await asyncio.sleep(delay)
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(body=PAGE, headers={'ETag': etag})
+    return handler
+
+def statuses(*codes):
+    """Handler answering with the given statuses in turn, then serving PAGE"""
+    codes = list(codes)
+    async def handler(request):
+        if codes:
+            return web.Response(status=codes.pop(0))
+        return web.Response(body=PAGE)
+    return handler
+
+def text(body, status=200):
+    async def handler(request):
+        return web.Response(text=body, status=status)
+    return handler
+
+def serve(routes, scenario):
+    """
+    Run scenario(server, requested) against a test server for the given routes
+
+    requested lists the path and query of every request the server received,
+    so tests can check what was actually sent over the network.
+    """
+    requested = []
+
+    async def handle(request):
+        requested.append(request.path_qs)
+        handler = routes.get(request.path)
+        if handler is None:
+            return web.Response(status=404)
+        return await handler(request)
+
+    async def main():
+        app = web.Application()
+        app.router.add_route('GET', '/{tail:.*}', handle)
+        async with TestServer(app) as server:
+            await scenario(server, requested)
+
+    asyncio.run(main())
+
+def make_fetcher(**kwargs):
+    kwargs.setdefault('requests_per_second', 1000)
+    kwargs.setdefault('backoff_factor', 0.01)
+    return URLFetcher(**kwargs)
@@ -0,0 +1,185 @@
+"""
+Tests for the course page parser
+"""
+
+import asyncio
+import json
+import os
+
+import pytest
+from aiohttp import web
+from bs4 import BeautifulSoup
+from lxml import html as lxml_html
+
+from courses_scrapper import CamosunCourseScraper
+from helpers import PAGE, make_fetcher, page, serve
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+FIXTURES_DIR = os.path.join(ROOT_DIR, 'tests', 'fixtures')
+COURSES_FILE = os.path.join(ROOT_DIR, 'data', 'camosun_courses.json')
+
+def _committed_course(code):
+    with open(COURSES_FILE, encoding='utf-8') as f:
+        return next(course for course in json.load(f) if course['code'] == code)
+
+# The fixture is synthetic (see its header comment), so the parser is also run
+# on other course body layouts. In each, html.parser's first <p> holds what the
+# committed record was scraped from, while libxml2 closes that <p> early.
+BODY_START = '<p><hr />Students'
+BODY_END = '</ul><br /><hr /></p>'
+LAYOUTS = {
+    'hr_inside_p': [],
+    'no_hr': [(BODY_START, '<p>Students')],
+    'hr_before_p': [(BODY_START, '<hr /><p>Students')],
+    'div_inside_p': [(BODY_START, '<p><div>Students'), (BODY_END, '</ul></div><br /><hr /></p>')],
+}
+
+def _course_page(layout):
+    with open(os.path.join(FIXTURES_DIR, 'synthetic_course_acct110.html'), encoding='utf-8') as f:
+        html_content = f.read()
+    for old, new in LAYOUTS[layout]:
+        assert old in html_content
+        html_content = html_content.replace(old, new)
+    return html_content.encode('utf-8')
+
+@pytest.mark.parametrize('layout', sorted(LAYOUTS))
+def test_course_page_layout_matches_committed_scrape(layout):
+    html_content = _course_page(layout)
+    record = _committed_course('ACCT 110')
+
+    # The committed data came from html.parser's first <p>...
+    first_p = BeautifulSoup(html_content, 'html.parser').select_one('td.block_content').find('p')
+    first_p_strings = first_p.find_all(string=True)
+    assert max(first_p_strings, key=len) == record['description']
+    assert 'Prerequisites' in first_p_strings
+    # ...which libxml2 closes before the requisite list
+    lxml_first_p = lxml_html.fromstring(html_content).xpath('(//td[@class="block_content"]//p)[1]')[0]
+    assert record['Prerequisites']['One of'][0] not in lxml_first_p.text_content().replace('\xa0', ' ')
+
+@pytest.mark.parametrize('layout', sorted(LAYOUTS))
+def test_extract_course_details_matches_committed_record(layout):
+    record = _committed_course('ACCT 110')
+
+    details = CamosunCourseScraper().extract_course_details(_course_page(layout), record['url'])
+
+    assert details == record
+    assert details['description']
+    assert details['Prerequisites']
+
+def test_save_to_json_before_scraping_writes_empty_list(tmp_path):
+    filename = tmp_path / 'camosun_courses.json'
+
+    CamosunCourseScraper().save_to_json(str(filename))
+
+    assert json.loads(filename.read_text(encoding='utf-8')) == []
+
+def test_save_to_json_converts_given_jsonl_file(tmp_path):
+    jsonl_file = tmp_path / 'camosun_courses.jsonl'
+    jsonl_file.write_text('{"code": "ACCT 110"}\n{"code": "ACCT 111"}\n', encoding='utf-8')
+    filename = tmp_path / 'camosun_courses.json'
+
+    CamosunCourseScraper().save_to_json(str(filename), jsonl_file=str(jsonl_file))
+
+    assert json.loads(filename.read_text(encoding='utf-8')) == [{"code": "ACCT 110"}, {"code": "ACCT 111"}]
+
+def test_load_previous_courses_skips_truncated_last_line(tmp_path):
+    jsonl_file = tmp_path / 'camosun_courses.jsonl'
+    jsonl_file.write_text('{"code": "ACCT 110", "url": "https://a/1"}\n{"code": "ACCT 1', encoding='utf-8')
+
+    previous_courses = CamosunCourseScraper().load_previous_courses(str(jsonl_file))
+
+    assert previous_courses == {"https://a/1": {"code": "ACCT 110", "url": "https://a/1"}}
+
+def test_validate_cache_only_revalidates_cached_previous_courses(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+    changed_versions = [page(etag='"v1"'), page(etag='"v2"')]
+
+    async def changed_page(request):
+        return await changed_versions[0](request)
+
+    async def scenario(server, requested):
+        unchanged, changed, new = (str(server.make_url(path)) for path in ('/unchanged', '/changed', '/new'))
+        async with make_fetcher(cache_file=cache_file) as fetcher:
+            for url in (unchanged, changed):
+                await fetcher.get(url)
+        changed_versions.pop(0)
+        del requested[:]
+
+        # Pages cached by the last run that also have a previous record are checked
+        # concurrently; only the one that comes back 304 keeps its record
+        previous_courses = {unchanged: {'code': 'A'}, changed: {'code': 'B'}}
+        urls = [unchanged, changed, new]
+        async with make_fetcher(cache_file=cache_file) as fetcher:
+            fresh_urls = await CamosunCourseScraper().validate_cache(fetcher, urls, previous_courses)
+            assert fresh_urls == {unchanged}
+            assert sorted(requested) == ['/changed', '/unchanged']
+
+            # Both revalidated pages are now served without another request
+            assert await fetcher.get(unchanged) == PAGE
+            assert await fetcher.get(changed) == PAGE
+            assert await fetcher.get(new) == PAGE
+        assert sorted(requested) == ['/changed', '/new', '/unchanged']
+
+    serve({'/unchanged': page(), '/changed': changed_page, '/new': page()}, scenario)
+
+LISTING_ROW = ('<tr><td><a href="preview_course_nopop.php?catoid=25&coid={coid}" '
+               'onclick="showCourse(\'25\', \'{coid}\', this)">ACCT {coid}&nbsp;-&nbsp;Course {coid}</a></td></tr>')
+COURSE_PAGE = (
+    '<html><body><table><tr><td class="block_content">'
+    '<h1 id="course_preview_title">ACCT {coid}&nbsp;-&nbsp;Course {coid}</h1>'
+    '<p><hr />Course {coid}, version {version} of the description.<br /><br />'
+    '<strong>Credits:</strong> 3<br /><strong>Hours:</strong> 60<br /><br />Prerequisites<br />One of:'
+    '<ul><li>C&nbsp;in English 12</li></ul><br /><hr /></p>'
+    '</td></tr></table></body></html>'
+)
+
+def test_scrape_all_courses_writes_listing_order_and_reuses_unchanged_records(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+    jsonl_file = tmp_path / 'camosun_courses.jsonl'
+    # Courses 101-103 are on the first listing page and 104-105 on page 2
+    listing_pages = {None: [101, 102, 103], '2': [104, 105]}
+    versions = {coid: 1 for coid in range(101, 106)}
+
+    async def calendar(request):
+        coid = request.query.get('coid')
+        if coid is None:
+            rows = ''.join(LISTING_ROW.format(coid=coid)
+                           for coid in listing_pages.get(request.query.get('filter[cpage]'), []))
+            return web.Response(text=f'<html><body><table>{rows}</table></body></html>', content_type='text/html')
+
+        coid = int(coid)
+        # Earlier courses answer last, so they finish out of listing order
+        await asyncio.sleep((106 - coid) * 0.01)
+        etag = f'"{coid}-{versions[coid]}"'
+        if request.headers.get('If-None-Match') == etag:
+            return web.Response(status=304, headers={'ETag': etag})
+        return web.Response(text=COURSE_PAGE.format(coid=coid, version=versions[coid]),
+                            content_type='text/html', headers={'ETag': etag})
+
+    def read_records():
+        return [json.loads(line) for line in jsonl_file.read_text(encoding='utf-8').splitlines()]
+
+    async def scenario(server, requested):
+        scraper = CamosunCourseScraper(base_url=str(server.make_url('/')), courses_url='/content.php',
+                                       requests_per_second=1000, cache_file=cache_file, parse_workers=2)
+        assert await scraper.scrape_all_courses(str(jsonl_file)) == 5
+
+        records = read_records()
+        assert [record['code'] for record in records] == [f'ACCT {coid}' for coid in range(101, 106)]
+        assert records[0]['description'] == 'Course 101, version 1 of the description.'
+        assert records[0]['Prerequisites'] == {'One of': ['C in English 12']}
+        assert not os.path.exists(str(jsonl_file) + '.tmp')
+
+        # Mark the written records, then change one course page
+        jsonl_file.write_text(''.join(json.dumps(dict(record, hours='last run')) + '\n' for record in records),
+                              encoding='utf-8')
+        versions[102] = 2
+
+        assert await scraper.scrape_all_courses(str(jsonl_file)) == 5
+
+        # Only the changed course is parsed again; the others keep last run's records
+        records = read_records()
+        assert [record['hours'] for record in records] == ['last run', '60', 'last run', 'last run', 'last run']
+        assert records[1]['description'] == 'Course 102, version 2 of the description.'
+
+    serve({'/content.php': calendar, '/preview_course_nopop.php': calendar}, scenario)
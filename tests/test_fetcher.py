@@ -0,0 +1,170 @@
+"""
+Tests for the shared page fetcher, run against a local aiohttp test server
+"""
+
+import asyncio
+import time
+from types import SimpleNamespace
+
+from helpers import PAGE, make_fetcher, page, serve, statuses, text
+from utils import http_cache
+
+def test_concurrent_requests_for_a_url_share_one_download():
+    async def scenario(server, requested):
+        url = str(server.make_url('/slow'))
+        async with make_fetcher() as fetcher:
+            bodies = await asyncio.gather(*[fetcher.get(url) for _ in range(5)])
+        assert bodies == [PAGE] * 5
+        assert requested == ['/slow']
+
+    serve({'/slow': page(delay=0.05)}, scenario)
+
+def test_page_fetched_this_run_is_served_from_cache(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+
+    async def scenario(server, requested):
+        url = str(server.make_url('/page'))
+        async with make_fetcher(cache_file=cache_file) as fetcher:
+            assert await fetcher.fetch(url) == (PAGE, False)
+            assert await fetcher.fetch(url) == (PAGE, False)
+        assert requested == ['/page']
+
+        # A new run revalidates once, then serves the page from the cache
+        async with make_fetcher(cache_file=cache_file) as fetcher:
+            assert await fetcher.fetch(url) == (PAGE, True)
+            assert await fetcher.fetch(url) == (PAGE, False)
+        assert requested == ['/page', '/page']
+
+    serve({'/page': page()}, scenario)
+
+def test_pages_without_validators_are_refetched_each_run(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+
+    async def scenario(server, requested):
+        url = str(server.make_url('/page'))
+        for _ in range(2):
+            async with make_fetcher(cache_file=cache_file) as fetcher:
+                assert await fetcher.get(url) == PAGE
+                assert not fetcher.is_cached(url)
+        assert requested == ['/page', '/page']
+
+    serve({'/page': text(PAGE.decode())}, scenario)
+
+def test_fresh_cache_entries_are_served_without_a_request(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+
+    async def scenario(server, requested):
+        url = str(server.make_url('/page'))
+        async with make_fetcher(cache_file=cache_file, cache_max_age=60) as fetcher:
+            assert await fetcher.get(url) == PAGE
+        async with make_fetcher(cache_file=cache_file, cache_max_age=60) as fetcher:
+            assert await fetcher.fetch(url) == (PAGE, False)
+        assert requested == ['/page']
+
+    # No validators: with cache_max_age set, the page is cached anyway
+    serve({'/page': text(PAGE.decode())}, scenario)
+
+def test_revalidate_checks_fresh_cache_entries_with_the_server(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+
+    async def scenario(server, requested):
+        url = str(server.make_url('/page'))
+        async with make_fetcher(cache_file=cache_file, cache_max_age=60) as fetcher:
+            assert await fetcher.get(url) == PAGE
+        async with make_fetcher(cache_file=cache_file, cache_max_age=60) as fetcher:
+            assert await fetcher.fetch(url, revalidate=True) == (PAGE, True)
+            # Once revalidated, the page is current for the rest of the run
+            assert await fetcher.fetch(url, revalidate=True) == (PAGE, False)
+        assert requested == ['/page', '/page']
+
+    serve({'/page': page()}, scenario)
+
+def test_not_modified_response_restarts_the_freshness_window(tmp_path, monkeypatch):
+    cache_file = str(tmp_path / 'http_cache.db')
+
+    async def scenario(server, requested):
+        url = str(server.make_url('/page'))
+        # Cache the page as if it had been stored an hour ago
+        monkeypatch.setattr(http_cache, 'time', SimpleNamespace(time=lambda: time.time() - 3600))
+        async with make_fetcher(cache_file=cache_file) as fetcher:
+            await fetcher.get(url)
+        monkeypatch.undo()
+
+        async with make_fetcher(cache_file=cache_file, cache_max_age=60) as fetcher:
+            assert await fetcher.fetch(url) == (PAGE, True)
+            assert fetcher.cache.get_fresh(url, 60) is not None
+        assert requested == ['/page', '/page']
+
+    serve({'/page': page()}, scenario)
+
+def test_transient_errors_are_retried():
+    async def scenario(server, requested):
+        async with make_fetcher(max_retries=3) as fetcher:
+            assert await fetcher.get(str(server.make_url('/flaky'))) == PAGE
+        assert requested == ['/flaky'] * 3
+
+    serve({'/flaky': statuses(503, 502)}, scenario)
+
+def test_retries_give_up_after_max_retries():
+    async def scenario(server, requested):
+        async with make_fetcher(max_retries=2) as fetcher:
+            assert await fetcher.get(str(server.make_url('/down'))) is None
+        assert requested == ['/down'] * 3
+
+    serve({'/down': statuses(503, 503, 503, 503)}, scenario)
+
+def test_client_errors_are_not_retried():
+    async def scenario(server, requested):
+        async with make_fetcher(max_retries=3) as fetcher:
+            assert await fetcher.get(str(server.make_url('/missing'))) is None
+        assert requested == ['/missing']
+
+    serve({}, scenario)
+
+def test_backoff_grows_between_retries():
+    async def scenario(server, requested):
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        async with make_fetcher(max_retries=3, backoff_factor=0.05) as fetcher:
+            assert await fetcher.get(str(server.make_url('/flaky'))) == PAGE
+        # 0.05 + 0.1 + 0.2 seconds of backoff before the fourth attempt
+        assert loop.time() - start >= 0.35
+
+    serve({'/flaky': statuses(503, 503, 503)}, scenario)
+
+def test_robots_txt_disallowed_pages_are_skipped():
+    robots = "User-agent: *\nDisallow: /private\n"
+
+    async def scenario(server, requested):
+        async with make_fetcher(respect_robots=True) as fetcher:
+            assert await fetcher.get(str(server.make_url('/private/page'))) is None
+            assert await fetcher.get(str(server.make_url('/page'))) == PAGE
+        # robots.txt is read once per run, and the disallowed page never requested
+        assert requested == ['/robots.txt', '/page']
+
+    serve({'/robots.txt': text(robots), '/page': page()}, scenario)
+
+def test_missing_robots_txt_allows_everything():
+    async def scenario(server, requested):
+        async with make_fetcher(respect_robots=True) as fetcher:
+            assert await fetcher.get(str(server.make_url('/page'))) == PAGE
+        assert requested == ['/robots.txt', '/page']
+
+    serve({'/page': page()}, scenario)
+
+def test_unreachable_robots_txt_disallows_the_site():
+    async def scenario(server, requested):
+        async with make_fetcher(respect_robots=True, max_retries=1) as fetcher:
+            assert await fetcher.get(str(server.make_url('/page'))) is None
+        # robots.txt goes through the same retries as pages
+        assert requested == ['/robots.txt', '/robots.txt']
+
+    serve({'/robots.txt': statuses(503, 503), '/page': page()}, scenario)
+
+def test_forbidden_robots_txt_disallows_the_site():
+    async def scenario(server, requested):
+        async with make_fetcher(respect_robots=True) as fetcher:
+            assert await fetcher.get(str(server.make_url('/page'))) is None
+        assert requested == ['/robots.txt']
+
+    serve({'/robots.txt': text('', status=403), '/page': page()}, scenario)
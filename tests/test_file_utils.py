@@ -0,0 +1,21 @@
+"""
+Tests for the file utilities
+"""
+
+import os
+
+import pytest
+
+from utils.file_utils import backup_file
+
+@pytest.mark.skipif(not hasattr(os, 'copy_file_range'), reason="needs os.copy_file_range")
+def test_backup_file_falls_back_when_copy_file_range_stops_early(tmp_path, monkeypatch):
+    source = tmp_path / 'data.json'
+    source.write_bytes(b'x' * 10000)
+    # e.g. a filesystem that reports no bytes copied instead of raising
+    monkeypatch.setattr(os, 'copy_file_range', lambda src, dst, count: 0)
+
+    backup_path = backup_file(str(source))
+
+    assert backup_path == str(source) + '.bak'
+    assert (tmp_path / 'data.json.bak').read_bytes() == source.read_bytes()
@@ -0,0 +1,62 @@
+"""
+Tests for the JSONL writer and the JSONL to JSON conversion
+"""
+
+import asyncio
+import io
+import json
+import logging
+import os
+
+import pytest
+
+from utils.jsonl import write_ordered_jsonl, jsonl_to_json
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+
+def _write(items, **kwargs):
+    async def run():
+        queue = asyncio.Queue()
+        for item in items:
+            queue.put_nowait(item)
+        queue.put_nowait(None)
+        return await write_ordered_jsonl(queue, fh, **kwargs)
+
+    fh = io.StringIO()
+    records_written = asyncio.run(run())
+    return records_written, [json.loads(line) for line in fh.getvalue().splitlines()]
+
+def test_write_ordered_jsonl_restores_order_and_skips_failures():
+    records_written, records = _write([(2, {'n': 2}), (0, {'n': 0}), (3, {'n': 'ü'}), (1, None)])
+
+    assert records_written == 3
+    assert records == [{'n': 0}, {'n': 2}, {'n': 'ü'}]
+
+def test_write_ordered_jsonl_logs_progress(caplog):
+    progress_logger = logging.getLogger('test_jsonl')
+    with caplog.at_level(logging.INFO, logger='test_jsonl'):
+        _write([(i, {'n': i}) for i in range(5)], label="courses", progress_every=2,
+               progress_logger=progress_logger)
+
+    assert [r.getMessage() for r in caplog.records] == ["Scraped 2 courses so far", "Scraped 4 courses so far"]
+
+@pytest.mark.parametrize('name', ['camosun_courses', 'camosun_programs'])
+def test_jsonl_to_json_reproduces_committed_file(tmp_path, name):
+    json_file = os.path.join(DATA_DIR, name + '.json')
+    with open(json_file, 'rb') as f:
+        original = f.read()
+    jsonl_file = tmp_path / (name + '.jsonl')
+    with open(jsonl_file, 'w', encoding='utf-8') as fh:
+        for record in json.loads(original):
+            fh.write(json.dumps(record, ensure_ascii=False) + '\n')
+
+    records = jsonl_to_json(jsonl_file, tmp_path / (name + '.json'))
+
+    assert records == len(json.loads(original))
+    assert (tmp_path / (name + '.json')).read_bytes() == original
+
+def test_jsonl_to_json_empty_file(tmp_path):
+    (tmp_path / 'empty.jsonl').write_bytes(b'')
+
+    assert jsonl_to_json(tmp_path / 'empty.jsonl', tmp_path / 'empty.json') == 0
+    assert json.loads((tmp_path / 'empty.json').read_bytes()) == []
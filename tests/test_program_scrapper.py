@@ -0,0 +1,97 @@
+"""
+Tests for the program scraper
+"""
+
+import asyncio
+import json
+
+from aiohttp import web
+
+import program_scrapper
+from helpers import make_fetcher, serve, text
+from program_scrapper import CamosunProgramScraper
+
+def test_save_to_json_before_scraping_writes_empty_list(tmp_path):
+    filename = tmp_path / 'camosun_programs.json'
+
+    CamosunProgramScraper().save_to_json(str(filename))
+
+    assert json.loads(filename.read_text(encoding='utf-8')) == []
+
+def test_fetcher_spaces_requests_to_the_site():
+    fetcher = CamosunProgramScraper().create_fetcher()
+
+    assert fetcher.throttle.min_delay == 1.5
+
+def test_listing_pages_are_refetched_within_the_cache_freshness_window(tmp_path):
+    cache_file = str(tmp_path / 'http_cache.db')
+    listings = [
+        ['/programs/accounting'],
+        ['/programs/accounting', '/programs/nursing'],
+    ]
+
+    async def listing(request):
+        # Only the first page lists programs; the next one is empty
+        hrefs = listings[0] if request.query.get('page') == ',0' else []
+        rows = ''.join(f'<div class="views-row"><a href="{href}">{href}</a></div>' for href in hrefs)
+        return await text(f'<html><body>{rows}</body></html>')(request)
+
+    async def scenario(server, requested):
+        scraper = CamosunProgramScraper(base_url=str(server.make_url('/')), programs_url='/find-program')
+        async with make_fetcher(cache_file=cache_file, cache_max_age=3600) as fetcher:
+            assert len(await scraper.get_all_program_links(fetcher)) == 1
+        listings.pop(0)
+
+        # A program added since the last run shows up on the next one
+        async with make_fetcher(cache_file=cache_file, cache_max_age=3600) as fetcher:
+            links = await scraper.get_all_program_links(fetcher)
+        assert [link['url'] for link in links] == [str(server.make_url(href)) for href in listings[0]]
+
+    serve({'/find-program': listing}, scenario)
+
+PROGRAM_PAGE = (
+    '<html><body><h1 class="page_title">Program {n}, Diploma</h1><div class="intro-text"> Intro {n} </div>'
+    '<div class="program_glance__info"><p class="info-title">Credential</p><p>Diploma</p></div>'
+    '<div id="program_tab"><div class="image-about">img</div><div>Overview of program {n}</div></div>'
+    '<div id="more_tab"><div><a class="button cta_button" href="/outline/{n}">Program outline</a></div></div>'
+    '</body></html>'
+)
+OUTLINE_PAGE = (
+    '<html><body><table><tr><td class="block_content">'
+    '<div class="acalog-core"><ul><li>ENGL 151 - Academic Writing (3 credits)</li><li>Elective</li></ul></div>'
+    '</td></tr></table></body></html>'
+)
+
+def test_scrape_all_programs_writes_programs_in_listing_order(tmp_path, monkeypatch):
+    monkeypatch.setattr(program_scrapper, 'MIN_DOMAIN_DELAY', 0)
+    jsonl_file = tmp_path / 'camosun_programs.jsonl'
+
+    async def listing(request):
+        # Two programs per page over two pages, then an empty page
+        page = int(request.query['page'].split(',')[1])
+        rows = ''.join(f'<div class="views-row"><a href="/programs/{n}">Program {n}</a></div>'
+                       for n in range(page * 2, page * 2 + 2) if page < 2)
+        return web.Response(text=f'<html><body>{rows}</body></html>', content_type='text/html')
+
+    async def program(request):
+        n = int(request.match_info['tail'].rsplit('/', 1)[1])
+        # Earlier programs answer last, so they finish out of listing order
+        await asyncio.sleep((4 - n) * 0.01)
+        return web.Response(text=PROGRAM_PAGE.format(n=n), content_type='text/html')
+
+    async def scenario(server, requested):
+        scraper = CamosunProgramScraper(base_url=str(server.make_url('/')), programs_url='/find-program',
+                                        requests_per_second=1000)
+        assert await scraper.scrape_all_programs(str(jsonl_file)) == 4
+
+        records = [json.loads(line) for line in jsonl_file.read_text(encoding='utf-8').splitlines()]
+        assert [record['title'] for record in records] == [f'Program {n}, Diploma' for n in range(4)]
+        assert records[0]['credential'] == 'Diploma'
+        assert records[0]['overview'] == 'Overview of program 0'
+        assert records[0]['curriculum'] == ['ENGL 151 - Academic Writing']
+        # Each outline page is downloaded once for both of its readers
+        assert sorted(path for path in requested if path.startswith('/outline/')) == [f'/outline/{n}' for n in range(4)]
+
+    serve({'/find-program': listing,
+           **{f'/programs/{n}': program for n in range(4)},
+           **{f'/outline/{n}': text(OUTLINE_PAGE) for n in range(4)}}, scenario)
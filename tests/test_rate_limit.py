@@ -0,0 +1,79 @@
+"""
+Tests for the request rate limiting utilities
+"""
+
+import asyncio
+import time
+from email.utils import formatdate
+
+from utils.rate_limit import AsyncRateLimiter, DomainThrottle, parse_retry_after
+
+def elapsed(coro_fn):
+    """Run coro_fn() and return how long it took in seconds"""
+    start = time.monotonic()
+    asyncio.run(coro_fn())
+    return time.monotonic() - start
+
+def test_parse_retry_after():
+    assert parse_retry_after('3') == 3.0
+    assert parse_retry_after('-1') == 0.0
+    assert 50 < parse_retry_after(formatdate(time.time() + 60, usegmt=True)) <= 60
+    assert parse_retry_after('soon') is None
+    assert parse_retry_after(None) is None
+
+def test_rate_limiter_allows_a_burst_then_refills_at_rate():
+    limiter = AsyncRateLimiter(rate=10, period=1.0)
+
+    async def burst():
+        for _ in range(10):
+            await limiter.acquire()
+
+    async def next_two():
+        await limiter.acquire()
+        await limiter.acquire()
+
+    assert elapsed(burst) < 0.05
+    # The bucket is empty, so each further request waits for a 0.1s refill
+    assert 0.15 <= elapsed(next_two) < 0.5
+
+def test_rate_limiter_pauses_on_retry_after():
+    limiter = AsyncRateLimiter(rate=100)
+    limiter.update_from_headers({'Retry-After': '0.2'})
+
+    assert elapsed(limiter.acquire) >= 0.18
+
+def test_rate_limiter_pauses_when_rate_limit_is_exhausted():
+    limiter = AsyncRateLimiter(rate=100)
+    limiter.update_from_headers({'X-RateLimit-Remaining': '1', 'X-RateLimit-Reset': '5'})
+    assert elapsed(limiter.acquire) < 0.05
+
+    limiter.update_from_headers({'X-RateLimit-Remaining': '0', 'X-RateLimit-Reset': '0.2'})
+    assert elapsed(limiter.acquire) >= 0.18
+
+def test_domain_throttle_spaces_requests_per_host():
+    throttle = DomainThrottle(min_delay=0.1)
+
+    async def requests():
+        for host in ('a.example', 'b.example', 'a.example', 'b.example'):
+            await throttle.wait(host)
+
+    # Two requests per host, one delay each, waited out for both hosts at once
+    assert 0.09 <= elapsed(requests) < 0.19
+
+def test_domain_throttle_uses_larger_crawl_delay():
+    throttle = DomainThrottle(min_delay=0.05)
+
+    async def requests():
+        await throttle.wait('a.example', 0.2)
+        await throttle.wait('a.example', 0.2)
+
+    assert elapsed(requests) >= 0.19
+
+def test_domain_throttle_without_delay_never_waits():
+    throttle = DomainThrottle()
+
+    async def requests():
+        for _ in range(100):
+            await throttle.wait('a.example')
+
+    assert elapsed(requests) < 0.05